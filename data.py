@@ -0,0 +1,196 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from plotly.colors import hex_to_rgb, qualitative
+
+EXCEL_PATH = "Israel-Palestine.xlsx"
+PARQUET_PATH = "Israel-Palestine.parquet"
+# Columns the app actually uses; the rest of the ACLED sheet is never read into memory
+USE_COLUMNS = ["event_date", "year", "disorder_type", "event_type", "sub_event_type", "actor1", "actor2", "country",
+               "admin1", "location", "latitude", "longitude", "notes", "fatalities"]
+CATEGORY_COLUMNS = ("country", "disorder_type", "event_type", "admin1", "location")
+COLOR_COLUMNS = ["r", "g", "b"]
+HOVER_NOTES_LENGTH = 140
+MAP_BIN_DEGREES = 0.02
+# Each cached filter state holds a copy of the filtered rows, so only the most recent ones are kept
+DATA_CACHE_SIZE = 16
+# A full CSV runs to tens of MB and is only built on request, so very few are worth keeping
+CSV_CACHE_SIZE = 4
+EVENT_PALETTE = np.array([hex_to_rgb(color) for color in qualitative.Plotly], dtype=np.uint8)
+
+def _ensure_parquet():
+    # Parsing the xlsx is by far the slowest part of a cold start, so convert it once
+    # and keep a Parquet copy next to it. Reconvert whenever the Excel file is newer.
+    if os.path.exists(PARQUET_PATH):
+        if not os.path.exists(EXCEL_PATH) or os.path.getmtime(PARQUET_PATH) >= os.path.getmtime(EXCEL_PATH):
+            return
+    # Write to a temporary file and swap it in, so another session never reads a half-written cache
+    tmp_path = f"{PARQUET_PATH}.{os.getpid()}.tmp"
+    pd.read_excel(EXCEL_PATH).to_parquet(tmp_path, engine="pyarrow", compression="zstd")
+    os.replace(tmp_path, PARQUET_PATH)
+
+def _read_data():
+    _ensure_parquet()
+    table = pq.read_table(PARQUET_PATH, columns=USE_COLUMNS)
+    # Map tooltips are assembled once here on the Arrow buffers, in C++ rather than with Python string
+    # objects, and with the notes cut short so they don't dominate the map payload
+    hover_parts = [pc.fill_null(table[column], '') for column in ('location', 'event_type', 'notes')]
+    hover_parts[2] = pc.utf8_slice_codeunits(hover_parts[2], 0, HOVER_NOTES_LENGTH)
+    # The separator must share the columns' string type: pandas 3 writes large_string, older versions string
+    separator = pa.scalar('<br>', hover_parts[0].type)
+    table = table.append_column('hover_text', pc.binary_join_element_wise(*hover_parts, separator))
+    df = table.to_pandas()
+    # Low-cardinality strings as categoricals and compact integer types keep the frame
+    # small and turn isin/groupby/value_counts into integer-code operations
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype("category")
+    df['year'] = df['year'].astype(np.int16)
+    df['fatalities'] = df['fatalities'].astype(np.int32)
+    # float32 coordinates still resolve to about a metre and halve the two columns sent to the WebGL map
+    df['latitude'] = df['latitude'].astype(np.float32)
+    df['longitude'] = df['longitude'].astype(np.float32)
+    # Map colors are looked up once per row from the event_type codes rather than on every map render
+    df[COLOR_COLUMNS] = EVENT_PALETTE[df['event_type'].cat.codes.to_numpy() % len(EVENT_PALETTE)]
+    return df
+
+@st.cache_resource(show_spinner=False)
+def start_loading():
+    # Reads the data on a background thread; main() calls this right after the page config, so the
+    # Parquet read overlaps with sending the title and intro to the browser
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(_read_data)
+    executor.shutdown(wait=False)
+    return future
+
+# cache_resource hands every caller the same frame instead of unpickling a fresh copy on each call,
+# so callers must treat it as read-only (filtering always produces a new frame)
+@st.cache_resource
+def load_data():
+    try:
+        return start_loading().result()
+    except ImportError:
+        start_loading.clear()
+        st.error("Failed to import openpyxl or pyarrow. Please ensure they are installed.")
+        st.stop()
+    except FileNotFoundError:
+        start_loading.clear()
+        st.error("The file 'Israel-Palestine.xlsx' was not found. Please check the file path.")
+        st.stop()
+    except Exception:
+        # Any other failure (a corrupt Parquet cache, a permissions error) must not stay cached either
+        start_loading.clear()
+        raise
+
+def fast_isin(series, values):
+    # isin for categorical columns: a boolean lookup table indexed by the category codes,
+    # so rows are never hashed. The extra last slot stays False and catches code -1 (missing).
+    lookup = np.zeros(len(series.cat.categories) + 1, dtype=bool)
+    positions = series.cat.categories.get_indexer(list(values))
+    lookup[positions[positions >= 0]] = True
+    return lookup[series.cat.codes.to_numpy()]
+
+def bin_locations(positions):
+    # Server-side grid binning for the map: one marker per ~2 km cell, placed at the incident-weighted
+    # centroid, sized by its incident count and colored by the cell's most frequent event type
+    keys = ['cell_lat', 'cell_lon']
+    cells = positions.assign(
+        cell_lat=np.floor(positions['latitude'] / MAP_BIN_DEGREES).astype(np.int32),
+        cell_lon=np.floor(positions['longitude'] / MAP_BIN_DEGREES).astype(np.int32),
+        lat_weight=positions['latitude'] * positions['count'],
+        lon_weight=positions['longitude'] * positions['count'],
+    )
+    totals = cells.groupby(keys, observed=True, sort=False)[['count', 'lat_weight', 'lon_weight']].sum()
+    by_type = cells.groupby(keys + ['event_type'], observed=True, sort=False)['count'].sum().reset_index()
+    dominant = by_type.loc[by_type.groupby(keys, observed=True, sort=False)['count'].idxmax()].set_index(keys)['event_type']
+    return pd.DataFrame({
+        'latitude': totals['lat_weight'] / totals['count'],
+        'longitude': totals['lon_weight'] / totals['count'],
+        'event_type': dominant,
+        'count': totals['count'],
+    }).reset_index(drop=True)
+
+@st.cache_data
+def get_filter_options():
+    # Widget options come from the unfiltered data once, so they stay stable whatever is selected and
+    # no rerun scans the frame for them; categories are already the sorted distinct values
+    df = load_data()
+    return {
+        'year_range': (int(df['year'].min()), int(df['year'].max())),
+        'countries': df['country'].cat.categories.tolist(),
+        'event_types': df['event_type'].cat.categories.tolist(),
+    }
+
+@st.cache_data(max_entries=DATA_CACHE_SIZE)
+def filter_data(countries, year_lo, year_hi, event_types):
+    # Arguments are small hashable tuples/ints, so Streamlit never has to hash the frame itself
+    df = load_data()
+    year_values = df['year'].to_numpy()
+    mask = np.logical_and.reduce([
+        fast_isin(df['country'], countries),
+        (year_values >= year_lo) & (year_values <= year_hi),
+        fast_isin(df['event_type'], event_types),
+    ])
+    # A single positional take materializes the selected rows once; the frame already holds only the used columns
+    return df.take(np.flatnonzero(mask))
+
+@st.cache_data(max_entries=DATA_CACHE_SIZE)
+def compute_aggregates(countries, year_lo, year_hi, event_types):
+    df = filter_data(countries, year_lo, year_hi, event_types)
+    total_events = len(df)
+
+    # One pass over the filtered rows: every statistic and chart table below is rolled up from this small
+    # per-(year, event type, disorder type, location) table instead of re-scanning the rows.
+    # dropna=False keeps rows with a missing key in every total, so the statistics agree with total_events
+    base = df.groupby(['year', 'event_type', 'disorder_type', 'location', 'country'],
+                      observed=True, sort=False, dropna=False).agg(count=('fatalities', 'size'), fatalities=('fatalities', 'sum'))
+    base = base.reset_index()
+
+    # Per-event-type totals straight from the category codes: a weighted bincount instead of a hashed groupby
+    event_type_categories = base['event_type'].cat.categories
+    event_type_codes = base['event_type'].cat.codes.to_numpy()
+    known = event_type_codes >= 0
+    event_type_count = np.bincount(event_type_codes[known], weights=base['count'].to_numpy()[known],
+                                   minlength=len(event_type_categories)).astype(np.int64)
+    present_event_types = np.flatnonzero(event_type_count)
+    # The year axis needs its groups in order, so this is the one groupby that keeps sorting
+    year_count = base.groupby('year', observed=True)['count'].sum()
+
+    bar_data = base.groupby(['location', 'country'], observed=True, sort=False)[['count', 'fatalities']].sum().reset_index()
+    bar_data.rename(columns={'count': 'Event Count'}, inplace=True)
+
+    # Many incidents share the exact same coordinates (ACLED geocodes to a location), so the aggregated
+    # map views only need one weighted point per distinct position. The two float keys made the base groupby
+    # slower than the aggregates it replaced, so the map gets its own; rows without coordinates are dropped here
+    positions = df.groupby(['longitude', 'latitude', 'event_type'], observed=True, sort=False).size().reset_index(name='count')
+    location_count = positions.groupby(['longitude', 'latitude'], sort=False)['count'].sum().reset_index()
+
+    return {
+        'total_events': total_events,
+        'unique_event_types': len(present_event_types),
+        'unique_disorder_types': base['disorder_type'].nunique(),
+        # Reuses the per-group fatality sums, so the fatalities column itself is read only once, by the base groupby
+        'total_fatalities': int(base['fatalities'].to_numpy().sum()),
+        'most_frequent_event_type': event_type_categories[event_type_count.argmax()] if total_events > 0 else None,
+        # Chart inputs are plain arrays/lists so the graph_objects traces take them without any per-chart conversion
+        'incident_years': year_count.index.to_numpy(),
+        'incident_counts': year_count.to_numpy(),
+        'event_type_labels': event_type_categories[present_event_types].tolist(),
+        'event_type_counts': event_type_count[present_event_types].tolist(),
+        'bar_data': bar_data,
+        'location_count': location_count,
+        'map_bins': bin_locations(positions),
+    }
+
+@st.cache_data(max_entries=CSV_CACHE_SIZE)
+def filtered_csv(countries, year_lo, year_hi, event_types):
+    df = filter_data(countries, year_lo, year_hi, event_types)
+    # The download carries every ACLED column, not just the ones loaded into memory: the frame keeps the
+    # Parquet row positions as its index, so the selected rows are read back from the full file
+    rows = pq.read_table(PARQUET_PATH).take(df.index.to_numpy())
+    return rows.to_pandas().to_csv(index=False).encode()
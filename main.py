@@ -1,70 +1,123 @@
-import seaborn
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import seaborn as sns
-from PIL import Image
-
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_excel("Israel-Palestine.xlsx")
-        return df
-    except ImportError as e:
-        st.error("Failed to import openpyxl. Please ensure it is installed.")
-        st.stop()
-    except FileNotFoundError:
-        st.error("The file 'Israel-Palestine.xlsx' was not found. Please check the file path.")
-        st.stop()
+import numpy as np
+import plotly.graph_objects as go
+import pydeck as pdk
 
-def main():
-    # Set page configuration to wide mode
-    st.set_page_config(page_title="Armed Conflicts in Israel and Palestine (2016-2024)", layout="wide",
-                       page_icon=":chart_with_upwards_trend:")
+from data import (COLOR_COLUMNS, EVENT_PALETTE, compute_aggregates, filter_data, filtered_csv, get_filter_options,
+                  start_loading)
+
+DISPLAY_COLUMNS = ["event_date", "country", "admin1", "location", "event_type", "sub_event_type", "disorder_type",
+                   "actor1", "actor2", "fatalities"]
+FIGURE_CACHE_SIZE = 16
+MAP_HOVER_BINS = 200
+MAX_CHART_POINTS = 1500
+TABLE_ROWS = 500
+
+TITLE = "Armed Conflicts in Israel and Palestine (2016-2024)"
+
+# Static page text lives at module scope so it is built once per process rather than on every rerun
+INTRO_MD = """
+This interactive data visualization project showcases incidents of armed conflicts in Israeli and Palestinian territories. 
+Since 2016, the occurrence of these conflicts has nearly doubled each year, frequently taking place in densely populated areas. 
+Users can examine patterns in these armed conflicts by using the filters on the right side to see how various factors evolve over time. 
+This project is still under development, and I am continuously working to improve it. 
+My aim is to transform it into a valuable tool for understanding these conflicts and revealing underlying patterns. 
+
+You are welcome to contribute [here](https://github.com/ptrrrrk/Armed-Conflicts-in-Israel-and-Palestine-2016-2024).
+
+**Data Source:** This data is sourced from the Armed Conflict Location & Event Data Project (ACLED) Curated Data Files. 
+ACLED provides real-time data on political violence and protest events around the world, making it a vital resource for understanding the dynamics of conflict.
+[ACLED Curated Data Files](https://acleddata.com/curated-data-files/)
+"""
+
+VARIABLES_MD = '''
+- :red[event_id_cnty:] A unique identifier for the event within the country, combining the country code and event ID.
+- :red[event_date:] The date when the event occurred, formatted as YYYY.MM.DD.
+- :red[year:] The year in which the event took place.
+- :red[time_precision:] The precision of the event's timestamp, such as "date" or "month".
+- :red[disorder_type:] The category of disorder represented by the event.
+- :red[event_type:] The nature of the event, indicating the type of conflict or violence that occurred.
+- :red[sub_event_type:] More specific classification within the main event type.
+- :red[actor1:] The primary actor involved in the event.
+- :red[assoc_actor_1:] Any associated actors with the primary actor.
+- :red[inter1:] Any international actors associated with the primary actor.
+- :red[actor2:] The second actor involved in the event.
+- :red[assoc_actor_2:] Any associated actors with the second actor.
+- :red[inter2:] Any international actors associated with the second actor.
+- :red[interaction:] The type of interaction between the actors.
+- :red[civilian_targeting:] Indicates if civilians were targeted during the event.
+- :red[iso:] The ISO country code for the location.
+- :red[region:] The broader region where the event occurred.
+- :red[country:] The country where the event took place.
+- :red[admin1:] The first-level administrative division within the country.
+- :red[admin2:] The second-level administrative division.
+- :red[admin3:] The third-level administrative division.
+- :red[location:] The specific place where the event occurred.
+- :red[latitude:] The latitude of the event's location.
+- :red[longitude:] The longitude of the event's location.
+- :red[geo_precision:] The precision of the geographical data.
+- :red[source:] The source of the event information.
+- :red[source_scale:] The scale of the source, indicating its geographic focus.
+- :red[notes:] Additional details and context about the event.
+- :red[fatalities:] The number of deaths associated with the event.
+'''
 
-    st.title("Armed Conflicts in Israel and Palestine (2016-2024)")
-    st.markdown("""
-        This interactive data visualization project showcases incidents of armed conflicts in Israeli and Palestinian territories. 
-        Since 2016, the occurrence of these conflicts has nearly doubled each year, frequently taking place in densely populated areas. 
-        Users can examine patterns in these armed conflicts by using the filters on the right side to see how various factors evolve over time. 
-        This project is still under development, and I am continuously working to improve it. 
-        My aim is to transform it into a valuable tool for understanding these conflicts and revealing underlying patterns. 
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets downsampling: keeps the first and last points and, from each bucket in
+    # between, the point forming the largest triangle with the previous pick and the next bucket's average
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = [0]
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        a = keep[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        keep.append(start + int(area.argmax()))
+    keep.append(n - 1)
+    return x[keep], y[keep]
 
-        You are welcome to contribute [here](https://github.com/ptrrrrk/Armed-Conflicts-in-Israel-and-Palestine-2016-2024).
+def main():
+    # Set page configuration to wide mode
+    st.set_page_config(page_title=TITLE, layout="wide", page_icon=":chart_with_upwards_trend:")
+    start_loading()
 
-        **Data Source:** This data is sourced from the Armed Conflict Location & Event Data Project (ACLED) Curated Data Files. 
-        ACLED provides real-time data on political violence and protest events around the world, making it a vital resource for understanding the dynamics of conflict.
-        [ACLED Curated Data Files](https://acleddata.com/curated-data-files/)
-    """)
+    st.title(TITLE)
+    st.markdown(INTRO_MD)
 
-    # Load the data
-    df = load_data()
+    # Load the data and the filter options derived from it
+    options = get_filter_options()
 
     # Sidebar filter options
     st.sidebar.header("Filter options")
     country_options = ["Palestine", "Israel", "Israel and Palestine"]
     selected_country = st.sidebar.selectbox("Select Country", options=country_options, index=2)  # Default to "Both"
     if selected_country == "Israel and Palestine":
-        df = df[df['country'].isin(["Palestine", "Israel"])]
+        countries = options['countries']
     else:
-        df = df[df['country'] == selected_country]
+        countries = [selected_country]
 
-    years = sorted(df['year'].unique())
-    selected_years = st.sidebar.slider("Select Year Range", min_value=int(years[0]), max_value=int(years[-1]),
-                                       value=(int(years[0]), int(years[-1])))
-    df = df[(df['year'] >= selected_years[0]) & (df['year'] <= selected_years[1])]
+    year_min, year_max = options['year_range']
+    selected_years = st.sidebar.slider("Select Year Range", min_value=year_min, max_value=year_max,
+                                       value=(year_min, year_max))
 
-    event_types = st.sidebar.multiselect("Select Event Type", options=df['event_type'].unique(),
-                                         default=df['event_type'].unique())
-    df = df[df['event_type'].isin(event_types)]
+    event_types = st.sidebar.multiselect("Select Event Type", options=options['event_types'],
+                                         default=options['event_types'])
+
+    # Filtering and aggregation are cached per filter state, so revisiting a selection is a cache lookup
+    filter_key = (tuple(sorted(countries)), selected_years[0], selected_years[1], tuple(sorted(event_types)))
+    aggregates = compute_aggregates(*filter_key)
 
     # Calculate statistics
-    total_events = len(df)
-    unique_event_types = df['event_type'].nunique()
-    unique_disorder_types = df['disorder_type'].nunique()
+    total_events = aggregates['total_events']
+    unique_event_types = aggregates['unique_event_types']
+    unique_disorder_types = aggregates['unique_disorder_types']
     average_events_per_year = total_events / (selected_years[1] - selected_years[0] + 1) if total_events > 0 else 0
-    total_fatalities = df['fatalities'].sum() if 'fatalities' in df.columns else None
-    most_frequent_event_type = df['event_type'].value_counts().idxmax() if total_events > 0 else None
+    total_fatalities = aggregates['total_fatalities']
+    most_frequent_event_type = aggregates['most_frequent_event_type']
 
     # Summary Display
     st.subheader("Summary Statistics")
@@ -83,10 +136,13 @@ def main():
     st.write(f"**Most Frequent Event Type: {most_frequent_event_type}**" if most_frequent_event_type else "No events")
 
     # Visualize data
-    visualize_data(df)
+    visualize_data(filter_key)
 
     st.subheader("Filtered Data")
-    st.dataframe(df, use_container_width=True)
+    # Only a window of rows and the columns worth scanning are sent to the table; the rest is left to the CSV download
+    st.dataframe(table_window(*filter_key), use_container_width=True, height=400, hide_index=True)
+    st.caption(f"Showing the first {min(TABLE_ROWS, total_events):,} of {total_events:,} rows")
+    _download_fragment(filter_key)
 
     # Add GitHub link and creator info at the bottom of the sidebar
     st.sidebar.markdown("---")
@@ -99,84 +155,196 @@ def main():
         '</div>', unsafe_allow_html=True
     )
 
-def visualize_data(df):
+def build_hexagon_deck(location_count):
+    # Incidents are binned into hexagons, so zoomed-out views draw a few hundred columns instead of every point
+    layer = pdk.Layer(
+        "HexagonLayer",
+        location_count,
+        get_position="[longitude, latitude]",
+        get_elevation_weight="count",
+        elevation_aggregation="SUM",
+        get_color_weight="count",
+        color_aggregation="SUM",
+        radius=500,
+        elevation_scale=10,
+        extruded=True,
+        pickable=True,
+    )
+    return pdk.Deck(
+        layers=[layer],
+        initial_view_state=pdk.ViewState(latitude=31.6, longitude=35.0, zoom=6.5, pitch=40),
+        map_style=None,
+        tooltip={"html": "{elevationValue} incidents"},
+    )
+
+def build_density_figure(location_count):
+    fig_density = go.Figure(go.Densitymap(lat=location_count['latitude'].to_numpy(),
+                                          lon=location_count['longitude'].to_numpy(),
+                                          z=location_count['count'].to_numpy(), radius=10))
+    fig_density.update_layout(map=dict(style="open-street-map", center=dict(lat=31.6, lon=35.0), zoom=6),
+                              height=500, margin=dict(l=0, r=0, t=0, b=0))
+    return fig_density
+
+def build_bins_figure(map_bins):
+    colors = EVENT_PALETTE[map_bins['event_type'].cat.codes.to_numpy() % len(EVENT_PALETTE)]
+    counts = map_bins['count'].to_numpy()
+    sizes = 4 + 26 * np.sqrt(counts / counts.max()) if len(counts) else counts
+    # The dense trace skips hover entirely, so mouse moves don't scan every marker; hover labels come
+    # from an invisible overlay holding only the largest bins
+    fig_bins = go.Figure(go.Scattermap(
+        lat=map_bins['latitude'].to_numpy(),
+        lon=map_bins['longitude'].to_numpy(),
+        mode='markers',
+        marker=dict(size=sizes, color=[f'rgb({r}, {g}, {b})' for r, g, b in colors], opacity=0.8),
+        hoverinfo='skip',
+    ))
+    top = np.argsort(counts)[::-1][:MAP_HOVER_BINS]
+    fig_bins.add_trace(go.Scattermap(
+        lat=map_bins['latitude'].to_numpy()[top],
+        lon=map_bins['longitude'].to_numpy()[top],
+        mode='markers',
+        marker=dict(size=sizes[top], opacity=0),
+        hovertext=[f"{event_type}<br>{count} incidents"
+                   for event_type, count in zip(map_bins['event_type'].to_numpy()[top], counts[top])],
+        hoverinfo='text',
+    ))
+    fig_bins.update_layout(map=dict(style="open-street-map", center=dict(lat=31.6, lon=35.0), zoom=6),
+                           height=500, showlegend=False, hovermode='closest', spikedistance=0, uirevision='map',
+                           margin=dict(l=0, r=0, t=0, b=0))
+    return fig_bins
+
+def build_events_deck(df):
+    # deck.gl draws the points on the GPU, which stays responsive with tens of thousands of incidents
+    layer = pdk.Layer(
+        "ScatterplotLayer",
+        df[['longitude', 'latitude', 'hover_text'] + COLOR_COLUMNS],
+        get_position="[longitude, latitude]",
+        get_fill_color="[r, g, b]",
+        get_radius=300,
+        radius_min_pixels=3,
+        pickable=True,
+    )
+    return pdk.Deck(
+        layers=[layer],
+        initial_view_state=pdk.ViewState(latitude=31.6, longitude=35.0, zoom=6.5),
+        map_style=None,
+        tooltip={"html": "{hover_text}"},
+    )
+
+def build_line_figure(aggregates):
+    # WebGL line trace instead of the SVG one px.line produces, never more than MAX_CHART_POINTS points
+    years, counts = lttb(aggregates['incident_years'], aggregates['incident_counts'], MAX_CHART_POINTS)
+    fig_line = go.Figure(go.Scattergl(x=years, y=counts, mode='lines'))
+    fig_line.update_layout(title="Incidents Count Over Time", xaxis=dict(dtick=1))
+    return fig_line
+
+def build_event_type_figure(aggregates):
+    # Horizontal bars instead of a pie: rectangles are cheaper to draw than arcs and easier to compare
+    order = np.argsort(aggregates['event_type_counts'])
+    fig_event_type = go.Figure(go.Bar(x=np.asarray(aggregates['event_type_counts'])[order],
+                                      y=np.asarray(aggregates['event_type_labels'])[order], orientation='h'))
+    fig_event_type.update_layout(title="Event Types Distribution", xaxis_title='count', height=300)
+    return fig_event_type
+
+def build_bar_figure(bar_data):
+    # Bars can't be resampled like a line, so past MAX_CHART_POINTS only the deadliest locations are kept
+    if len(bar_data) > MAX_CHART_POINTS:
+        bar_data = bar_data.nlargest(MAX_CHART_POINTS, 'fatalities').sort_index()
+    # One trace per country, as px.bar(color='country') would produce, without the Express data wrangling
+    fig_bar = go.Figure()
+    for country, color in (('Israel', 'blue'), ('Palestine', 'red')):
+        rows = bar_data[bar_data['country'] == country]
+        fig_bar.add_trace(go.Bar(x=rows['location'].to_numpy(), y=rows['fatalities'].to_numpy(),
+                                 text=rows['Event Count'].to_numpy(), name=country, marker_color=color))
+    fig_bar.update_layout(xaxis_title='location', yaxis_title='fatalities', legend_title_text='country',
+                          width=800, height=600)
+    return fig_bar
+
+# A cache hit on filter_data unpickles the whole filtered frame, so the rerun only ever fetches this small window
+@st.cache_data(max_entries=FIGURE_CACHE_SIZE)
+def table_window(countries, year_lo, year_hi, event_types):
+    return filter_data(countries, year_lo, year_hi, event_types).head(TABLE_ROWS)[DISPLAY_COLUMNS]
+
+# Figures are cached per filter state and shared across sessions, so only a filter change rebuilds them.
+# Arguments are the hashable filter key; the cached objects are only ever read by the st.*_chart calls.
+@st.cache_resource(max_entries=FIGURE_CACHE_SIZE)
+def build_figures(countries, year_lo, year_hi, event_types):
+    aggregates = compute_aggregates(countries, year_lo, year_hi, event_types)
+    return build_line_figure(aggregates), build_event_type_figure(aggregates), build_bar_figure(aggregates['bar_data'])
+
+@st.cache_resource(max_entries=FIGURE_CACHE_SIZE)
+def build_map(map_view, countries, year_lo, year_hi, event_types):
+    if map_view == "Individual events":
+        return build_events_deck(filter_data(countries, year_lo, year_hi, event_types))
+    aggregates = compute_aggregates(countries, year_lo, year_hi, event_types)
+    if map_view == "Dominant event type":
+        return build_bins_figure(aggregates['map_bins'])
+    if map_view == "Density heatmap":
+        return build_density_figure(aggregates['location_count'])
+    return build_hexagon_deck(aggregates['location_count'])
+
+def _event_legend():
+    legend = []
+    for code, event_type in enumerate(get_filter_options()['event_types']):
+        r, g, b = EVENT_PALETTE[code % len(EVENT_PALETTE)]
+        legend.append(f'<span style="color: rgb({r}, {g}, {b});">&#9679;</span> {event_type}')
+    st.markdown(" &nbsp; ".join(legend), unsafe_allow_html=True)
+
+@st.fragment
+def _map_fragment(filter_key):
     # Map Visualization - Categorize by Event Type
     st.subheader("Incident Locations by Event Type")
-    df['hover_text'] = df['location'] + '<br>' + df['event_type'] + '<br>' + df['notes']
-
-    fig_map = px.scatter_mapbox(
-        df,
-        lat='latitude',
-        lon='longitude',
-        hover_name='hover_text',
-        color='event_type',
-        color_discrete_sequence=px.colors.qualitative.Plotly,
-        zoom=5,
-        height=500
-    )
-    fig_map.update_layout(mapbox_style="open-street-map")
-    fig_map.update_layout(title="Incident Locations Categorized by Event Type")
-    st.plotly_chart(fig_map)
+    map_view = st.radio("Map view", ["Hexagon bins", "Density heatmap", "Dominant event type", "Individual events"],
+                        horizontal=True,
+                        help="Individual events sends every incident to the browser and is the slowest view")
+    map_figure = build_map(map_view, *filter_key)
+    if map_view in ("Density heatmap", "Dominant event type"):
+        st.plotly_chart(map_figure, config={'scrollZoom': True})
+    else:
+        st.pydeck_chart(map_figure)
+    if map_view in ("Dominant event type", "Individual events"):
+        _event_legend()
 
+@st.fragment
+def _line_fragment(fig_line):
     # Line Graph - Incident Count Over Time
     st.subheader("Incidents Count Over Time")
-    incident_count = df.groupby('year').size().reset_index(name='count')
-    fig_line = px.line(incident_count, x='year', y='count', title="Incidents Count Over Time")
-    fig_line.update_layout(xaxis=dict(dtick=1))
     st.plotly_chart(fig_line)
 
-    # Pie Chart - Event Types Distribution
-    st.subheader("Event Types Proportion")
-    event_type_count = df['event_type'].value_counts().reset_index()
-    event_type_count.columns = ['event_type', 'count']
-    fig_pie_event = px.pie(event_type_count, names='event_type', values='count', title="Event Types Distribution",
-                           width=300, height=300)
-    st.plotly_chart(fig_pie_event)
+@st.fragment
+def _event_type_fragment(fig_event_type):
+    # Bar Chart - Event Types Distribution
+    st.subheader("Event Types Distribution")
+    st.plotly_chart(fig_event_type)
 
+@st.fragment
+def _bar_fragment(fig_bar):
     # Bar Chart of Fatalities vs. Events by Location
     st.subheader("Fatalities by Location")
-    bar_data = df.groupby(['location', 'country']).agg({'event_id_cnty': 'count', 'fatalities': 'sum'}).reset_index()
-    bar_data.rename(columns={'event_id_cnty': 'Event Count'}, inplace=True)
-
-    fig_bar = px.bar(bar_data, x='location', y='fatalities', text='Event Count',
-                     color='country',
-                     color_discrete_map={'Israel': 'blue', 'Palestine': 'red'},
-                     width=800, height=600)
     st.plotly_chart(fig_bar)
 
+@st.fragment
+def _download_fragment(filter_key):
+    # Writing the CSV is the slowest step of a rerun, so it is only built once someone asks for it
+    if st.button("Prepare full CSV"):
+        st.download_button("Download full CSV", filtered_csv(*filter_key), "filtered.csv", mime="text/csv")
+
+@st.fragment
+def _variables_fragment():
     # Variables list
     with st.expander("See the list of variables with explanation"):
-        st.markdown('''
-            - :red[event_id_cnty:] A unique identifier for the event within the country, combining the country code and event ID.
-            - :red[event_date:] The date when the event occurred, formatted as YYYY.MM.DD.
-            - :red[year:] The year in which the event took place.
-            - :red[time_precision:] The precision of the event's timestamp, such as "date" or "month".
-            - :red[disorder_type:] The category of disorder represented by the event.
-            - :red[event_type:] The nature of the event, indicating the type of conflict or violence that occurred.
-            - :red[sub_event_type:] More specific classification within the main event type.
-            - :red[actor1:] The primary actor involved in the event.
-            - :red[assoc_actor_1:] Any associated actors with the primary actor.
-            - :red[inter1:] Any international actors associated with the primary actor.
-            - :red[actor2:] The second actor involved in the event.
-            - :red[assoc_actor_2:] Any associated actors with the second actor.
-            - :red[inter2:] Any international actors associated with the second actor.
-            - :red[interaction:] The type of interaction between the actors.
-            - :red[civilian_targeting:] Indicates if civilians were targeted during the event.
-            - :red[iso:] The ISO country code for the location.
-            - :red[region:] The broader region where the event occurred.
-            - :red[country:] The country where the event took place.
-            - :red[admin1:] The first-level administrative division within the country.
-            - :red[admin2:] The second-level administrative division.
-            - :red[admin3:] The third-level administrative division.
-            - :red[location:] The specific place where the event occurred.
-            - :red[latitude:] The latitude of the event's location.
-            - :red[longitude:] The longitude of the event's location.
-            - :red[geo_precision:] The precision of the geographical data.
-            - :red[source:] The source of the event information.
-            - :red[source_scale:] The scale of the source, indicating its geographic focus.
-            - :red[notes:] Additional details and context about the event.
-            - :red[fatalities:] The number of deaths associated with the event.
-        ''')
+        st.markdown(VARIABLES_MD)
+
+def visualize_data(filter_key):
+    # Each chart is its own fragment, so interacting with one (e.g. switching the map view)
+    # reruns only that chart instead of the whole script
+    fig_line, fig_event_type, fig_bar = build_figures(*filter_key)
+    _map_fragment(filter_key)
+    _line_fragment(fig_line)
+    _event_type_fragment(fig_event_type)
+    _bar_fragment(fig_bar)
+
+    _variables_fragment()
 
 if __name__ == '__main__':
     main()